@@ -28,6 +28,9 @@ const LOCALHOST_ENDPOINT = 'http://localhost:8080';
 
 // Configuration
 const HOVER_DELAY = 300; // ms before showing hover icon
+// Longest image side the backend keeps; keep in sync with MAX_IMAGE_SIZE in
+// revela-app/src/session_manager.py
+const MAX_IMAGE_DIMENSION = 1024;
 
 // Get API endpoint based on settings
 async function getApiEndpoint() {
@@ -86,6 +89,24 @@ function isAnalyzableElement(element) {
   return false;
 }
 
+// Export an image or canvas as a JPEG data URL no larger than the backend keeps.
+// JPEG lets the backend decode at reduced scale and is far smaller to upload.
+// Throws if the source is cross-origin (tainted canvas).
+function exportImageData(source, width, height) {
+  const scale = Math.min(1, MAX_IMAGE_DIMENSION / Math.max(width, height));
+  const canvas = document.createElement('canvas');
+  canvas.width = Math.round(width * scale);
+  canvas.height = Math.round(height * scale);
+  const ctx = canvas.getContext('2d');
+  
+  // JPEG has no alpha; paint transparent areas white as the page would
+  ctx.fillStyle = '#ffffff';
+  ctx.fillRect(0, 0, canvas.width, canvas.height);
+  ctx.drawImage(source, 0, 0, canvas.width, canvas.height);
+  
+  return canvas.toDataURL('image/jpeg', 0.92);
+}
+
 // Extract data from element
 function extractElementData(element) {
   if (element.tagName === 'TABLE') {
@@ -103,16 +124,12 @@ function extractElementData(element) {
     let imageData = null;
     
     try {
-      const canvas = document.createElement('canvas');
-      canvas.width = element.naturalWidth || element.width;
-      canvas.height = element.naturalHeight || element.height;
-      const ctx = canvas.getContext('2d');
-      
-      // Try to draw image - this will succeed if same-origin or CORS-enabled
-      ctx.drawImage(element, 0, 0);
-      
-      // Try to export - this will fail if image is "tainted"
-      imageData = canvas.toDataURL('image/png');
+      // Try to draw and export - this will fail if the image is "tainted"
+      imageData = exportImageData(
+        element,
+        element.naturalWidth || element.width,
+        element.naturalHeight || element.height
+      );
       console.log('Revela: Successfully extracted image data');
     } catch (error) {
       console.warn('Revela: Cannot extract image data due to CORS restrictions:', error.message);
@@ -132,7 +149,7 @@ function extractElementData(element) {
   
   if (element.tagName === 'CANVAS') {
     try {
-      const dataUrl = element.toDataURL('image/png');
+      const dataUrl = exportImageData(element, element.width, element.height);
       return {
         type: 'canvas',
         dataUrl: dataUrl,
@@ -248,6 +265,62 @@ function removeHoverIcon() {
   currentIconElement = null;
 }
 
+// Read a server-sent event stream, calling onChunk with the accumulated text.
+// Renders are coalesced to one per animation frame so re-parsing the markdown
+// does not grow quadratically with the number of tokens.
+// Resolves with the final "done" event, which carries any extra response fields.
+async function readEventStream(response, onChunk) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  let renderFrame = null;
+  
+  while (true) {
+    const { done, value } = await reader.read();
+    
+    if (done) break;
+    
+    // Decode chunk and add to buffer
+    buffer += decoder.decode(value, { stream: true });
+    
+    // Process complete messages
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || ''; // Keep incomplete line in buffer
+    
+    for (const line of lines) {
+      if (!line.startsWith('data: ')) continue;
+      
+      const data = JSON.parse(line.slice(6));
+      
+      if (data.error) {
+        throw new Error(data.error);
+      }
+      
+      if (data.chunk) {
+        text += data.chunk;
+        if (renderFrame === null) {
+          renderFrame = requestAnimationFrame(() => {
+            renderFrame = null;
+            onChunk(text);
+          });
+        }
+      }
+      
+      if (data.done) {
+        // Flush the final text immediately
+        if (renderFrame !== null) {
+          cancelAnimationFrame(renderFrame);
+          onChunk(text);
+        }
+        return data;
+      }
+    }
+  }
+  
+  throw new Error('Stream ended before the response was complete');
+}
+
 // Handle Quick Insights
 async function handleQuickInsights(element) {
   const sessionId = generateSessionId();
@@ -265,7 +338,8 @@ async function handleQuickInsights(element) {
     const payload = {
       sessionId,
       data: elementData,
-      url: window.location.href
+      url: window.location.href,
+      stream: true
     };
     
     console.log('Revela: Sending request:', payload);
@@ -286,11 +360,21 @@ async function handleQuickInsights(element) {
       throw new Error(`API error: ${response.status} - ${errorText}`);
     }
     
-    const result = await response.json();
+    // Render insights progressively as they stream in
+    let insightsEl = null;
+    const result = await readEventStream(response, (insights) => {
+      if (!insightsEl) {
+        insightsEl = updateQuickInsightsSidebar(sessionId, insights);
+      } else {
+        insightsEl.innerHTML = parseMarkdown(insights);
+      }
+    });
     console.log('Revela: Got insights:', result);
     
-    // Update sidebar with insights
-    updateQuickInsightsSidebar(sessionId, result.insights);
+    if (!insightsEl) {
+      // Nothing streamed; still clear the loading state
+      updateQuickInsightsSidebar(sessionId, '');
+    }
     
   } catch (error) {
     console.error('Quick insights error:', error);
@@ -655,6 +739,7 @@ function updateQuickInsightsSidebar(sessionId, insights, error = null) {
   
   messagesContainer.appendChild(messageEl);
   messagesContainer.scrollTop = messagesContainer.scrollHeight;
+  return messageEl;
 }
 
 function closeSidebar() {
@@ -704,30 +789,38 @@ async function sendMessage(sessionId) {
       },
       body: JSON.stringify({
         sessionId,
-        message
+        message,
+        stream: true
       })
     });
     
     console.log('Revela: Response status:', response.status);
     
-    // Remove typing indicator
-    typingIndicator.remove();
-    
     if (!response.ok) {
+      typingIndicator.remove();
       const errorText = await response.text();
       console.error('Revela: API error response:', errorText);
       throw new Error(`API error: ${response.status} - ${errorText}`);
     }
     
-    const result = await response.json();
-    
-    // Add assistant response
+    // Add assistant response, replacing the typing indicator once text arrives
     const assistantMsg = document.createElement('div');
     assistantMsg.className = 'revela-message revela-assistant-message';
-    // Parse markdown to HTML
-    assistantMsg.innerHTML = parseMarkdown(result.response);
-    messagesContainer.appendChild(assistantMsg);
-    
+    const result = await readEventStream(response, (text) => {
+      if (!assistantMsg.isConnected) {
+        typingIndicator.replaceWith(assistantMsg);
+      }
+      // Parse markdown to HTML
+      assistantMsg.innerHTML = parseMarkdown(text);
+      messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    });
+
+    if (!assistantMsg.isConnected) {
+      // Nothing streamed; still show a reply in place of the typing indicator
+      assistantMsg.innerHTML = '<em>No response was generated.</em>';
+      typingIndicator.replaceWith(assistantMsg);
+    }
+
     // Add data result if available
     if (result.has_data && result.data) {
       const dataMsg = document.createElement('div');
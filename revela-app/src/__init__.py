@@ -1,5 +1,6 @@
-"""Revela App - Main package"""
+"""Revela App - Main package
 
-from src.app import app, create_app
-
-__all__ = ['app', 'create_app']
+The Flask app lives in src.app (run as src.app:app). It is not imported
+here, so submodules loaded on their own, such as src.chart_worker in a
+chart render process, do not start the whole app.
+"""
@@ -1,42 +1,74 @@
 """
 Revela Flask App - Backend API for ephemeral data analysis
 """
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, url_for
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from PIL import Image
+import functools
 import io
+import itertools
 import logging
-import base64
+import queue
+import threading
 from pathlib import Path
-import json
-import re
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+import orjson
+import pybase64
 import polars as pl
 
 from src.config_module import config
-from src.ollama_client import ollama_client
-from src.session_manager import session_manager
-from src.llm_code_executor import CodeExecutor, create_chart_prompt
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.ollama_client import extract_json_object, ollama_client
+from src.session_manager import AnalysisSession, session_manager
+from src.llm_code_executor import CodeExecutor, create_chart_prompt, result_data_json, to_prompt_json
+from src.chart_renderer import chart_renderer
+
+# Logging is configured once in config_module
 logger = logging.getLogger(__name__)
 logger.info("=== Revela Flask App Starting ===")
-logger.info(f"Environment: {config.environment}")
-logger.info(f"Ollama URL: {config.ollama_host}")
+logger.info("Environment: %s", config.environment)
+logger.info("Ollama URL: %s", config.ollama_host)
 
 # Get the absolute path to the images directory
 CURRENT_DIR = Path(__file__).parent.parent
 LOGO_PATH = CURRENT_DIR / "ui" / "static" / "images" / "logo.png"
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify."""
+    
+    def _dumps_bytes(self, obj: Any, **kwargs: Any) -> bytes:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps_bytes(obj, **kwargs).decode()
+    
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Hand orjson's bytes straight to the response; going through dumps()
+        # would decode and re-encode large payloads such as chart data URIs
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype
+        )
+
+
 # Initialize Flask app
 app = Flask(__name__, 
             template_folder='../ui/templates',
             static_folder='../ui/static')
+app.json = OrjsonProvider(app)
 
 # Enable CORS for extension - Allow all origins since content script runs on any website
+# Flask answers OPTIONS automatically for every route and Flask-CORS adds the
+# preflight headers, so handlers only ever see their real methods
 CORS(app, resources={
     r"/api/*": {
         "origins": "*",  # Allow all origins (content script can be on any website)
@@ -48,30 +80,234 @@ CORS(app, resources={
 
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Body cap for endpoints that only carry a session ID and chat text
+SMALL_BODY_LIMIT = 64 * 1024
+
+# Max chunks buffered between the LLM producer thread and a streaming response
+STREAM_QUEUE_SIZE = 64
+
+# Pre-built server-sent event frames
+SSE_CHUNK_PREFIX = b'data: {"chunk":'
+SSE_CHUNK_SUFFIX = b'}\n\n'
+SSE_DONE_FRAME = b'data: {"done":true}\n\n'
+SSE_HEADERS = {
+    # Deliver each event as it is produced instead of letting proxies buffer
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+# Sessions built at once (image decode, HTML table parse into Polars); past this,
+# requests wait briefly and are then turned away with a 503 instead of piling
+# more CPU-bound work onto the worker's threads
+MAX_CONCURRENT_SESSION_BUILDS = 4
+SESSION_BUILD_WAIT_SECONDS = 5
+session_build_slots = threading.BoundedSemaphore(MAX_CONCURRENT_SESSION_BUILDS)
+
+# Invariant parts of the deep-analyse code-generation prompt; only the dataset
+# details, conversation and question are formatted per request
+CODE_PROMPT_HEADER = "You are a data analysis assistant with access to a Polars DataFrame called 'df'."
+CODE_PROMPT_INSTRUCTIONS = """**IMPORTANT Instructions:**
+1. Write Polars code to answer the question
+2. Store the final result in a variable called 'result'
+3. Return ONLY the Python code, no explanations
+4. DO NOT include import statements - 'pl' and 'df' are already available
+5. Use pl.col() for column references
+6. Handle string/numeric conversions as needed
+7. For multi-row results, use .to_dict() or select first row with [0] if needed
+8. NEVER use .item() unless you're certain the result is a single value (1x1)
+9. For multi-step table results (filter/group/sort), you may start from df.lazy() and leave 'result' as a LazyFrame; it is collected for you
+
+**Example for single value (1x1 result):**
+```python
+result = df.filter(pl.col('country') == 'India').select('gdp').item()
+```
+
+**Example for multi-row result:**
+```python
+result = df.filter(pl.col('region') == 'Asia').select(['country', 'gdp']).head(5).to_dict()
+```
+
+**Example for aggregation:**
+```python
+result = df.select(pl.col('gdp').sum()).item()
+```
+
+"""
+
+# Phrases in a deep-analyse message that ask for a chart, per data type
+TABLE_CHART_KEYWORDS = ('chart', 'plot', 'visualize')
+IMAGE_CHART_KEYWORDS = ('chart', 'plot', 'graph', 'visualize', 'show me')
+
+# Let browsers cache static CSS/JS in production instead of revalidating on every page load
+if config.is_production:
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
 
-def get_base64_image_from_path(image_path: Path) -> str:
-    """Convert image file to base64 string."""
-    try:
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode()
-    except Exception as e:
-        logger.warning(f"Could not load image from {image_path}: {e}")
-        return ""
 
+# The logo is served as a static file so browsers cache it instead of it being
+# inlined as base64 (twice) into every rendered page
+LOGO_EXISTS = LOGO_PATH.exists()
 
-def process_image_data(image_data: str) -> Image.Image:
-    """Process base64 image data and return PIL Image."""
+
+def process_image_data(image_data: str) -> Optional[bytes]:
+    """
+    Decode base64 image data and return the raw image bytes.
+    
+    The image is only verified here, not decoded; the Ollama client decodes it
+    at most once, and not at all for cached or already model-sized JPEG inputs.
+    """
     try:
-        # Remove data URL prefix if present
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        # Remove data URL prefix if present (base64 itself never contains a comma);
+        # partition is a single scan with no intermediate list
+        _, sep, payload = image_data.partition(',')
         
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes))
-        return image
+        image_bytes = pybase64.b64decode(payload if sep else image_data, validate=False)
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image.verify()
+        return image_bytes
     except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
+        logger.error("Error processing image: %s", e)
+        return None
+
+
+def max_body(limit: int) -> Callable:
+    """
+    Reject requests whose declared body exceeds `limit` bytes with a 413 before
+    any JSON is parsed. Endpoints that never carry images use this instead of
+    the app-wide 16MB MAX_CONTENT_LENGTH.
+    """
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.content_length is not None and request.content_length > limit:
+                logger.warning("Rejected %s byte body for %s (limit %s)", request.content_length, request.path, limit)
+                return jsonify({'error': 'Request body too large'}), 413
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def build_session(session_id: str, element_data: Dict, url: str) -> Optional[AnalysisSession]:
+    """
+    Build an analysis session, or return None if the server is too busy to take it.
+    """
+    if not session_build_slots.acquire(timeout=SESSION_BUILD_WAIT_SECONDS):
+        logger.warning("Session build rejected, %s already in progress", MAX_CONCURRENT_SESSION_BUILDS)
         return None
+    try:
+        return AnalysisSession(session_id, element_data, url)
+    finally:
+        session_build_slots.release()
+
+
+def server_busy_response() -> tuple:
+    """503 response asking the extension to retry shortly."""
+    response = jsonify({'error': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = str(SESSION_BUILD_WAIT_SECONDS)
+    return response, 503
+
+
+def stream_in_background(chunks: Iterable[str], maxsize: int = STREAM_QUEUE_SIZE) -> Iterator[str]:
+    """
+    Consume an iterable on a daemon thread and yield its items through a bounded queue.
+    
+    The bounded queue backpressures the producer when the client reads slowly, and
+    the producer stops as soon as the consumer is closed (e.g. client disconnect).
+    Exceptions raised by the iterable are re-raised in the consumer.
+    """
+    chunk_queue: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                chunk_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put((chunk, None)):
+                    return
+            put((done, None))
+        except Exception as e:
+            put((done, e))
+    
+    threading.Thread(target=produce, daemon=True).start()
+    
+    try:
+        while True:
+            chunk, error = chunk_queue.get()
+            if chunk is done:
+                if error is not None:
+                    raise error
+                return
+            yield chunk
+    finally:
+        stop.set()
+
+
+def chart_payload(chart_image: Optional[bytes]) -> Dict[str, Any]:
+    """Response fields for an optional chart, as a data URI in the configured format."""
+    chart = None
+    if chart_image:
+        chart = f"data:{chart_renderer.mime_type};base64,{pybase64.b64encode_as_string(chart_image)}"
+    return {'has_chart': chart is not None, 'chart': chart}
+
+
+def sse_frame(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as a single server-sent event frame."""
+    return b'data: ' + orjson.dumps(payload) + b'\n\n'
+
+
+def stream_events(chunks: Iterable[str],
+                  finish: Optional[Callable[[str], Dict[str, Any]]] = None) -> Response:
+    """
+    Stream LLM chunks to the client as server-sent events.
+    
+    Once the text is complete, ``finish`` is called with it and the fields it
+    returns are sent along with the final ``done`` event.
+    """
+    def generate():
+        # Only keep the full text around when finish needs it
+        parts = [] if finish is not None else None
+        try:
+            for chunk in stream_in_background(chunks):
+                if parts is not None:
+                    parts.append(chunk)
+                yield SSE_CHUNK_PREFIX + orjson.dumps(chunk) + SSE_CHUNK_SUFFIX
+            
+            # Send completion signal
+            if finish is None:
+                yield SSE_DONE_FRAME
+            else:
+                yield sse_frame({'done': True, **finish(''.join(parts))})
+            
+        except Exception as e:
+            logger.error("Error while streaming response: %s", e)
+            yield sse_frame({'error': str(e)})
+    
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+def llm_response(chunks: Iterable[str], text_key: str, stream: bool,
+                 finish: Optional[Callable[[str], Dict[str, Any]]] = None) -> Response:
+    """
+    Return LLM output as an event stream, or buffered into one JSON body for
+    clients that did not ask for streaming.
+    """
+    if stream:
+        return stream_events(chunks, finish)
+    
+    text = ''.join(chunks)
+    return jsonify({
+        'success': True,
+        text_key: text,
+        **(finish(text) if finish else {})
+    })
 
 
 @app.route('/')
@@ -80,14 +316,11 @@ def index():
     # Check Ollama connection
     logger.info("Performing Ollama health check...")
     health_check_result = ollama_client.check_health()
-    logger.info(f"Health check result: {health_check_result}")
-    
-    # Get logo as base64
-    logo_base64 = get_base64_image_from_path(LOGO_PATH) if LOGO_PATH.exists() else ""
+    logger.info("Health check result: %s", health_check_result)
     
     return render_template(
         'index.html',
-        logo_base64=logo_base64,
+        logo_url=url_for('static', filename='images/logo.png') if LOGO_EXISTS else "",
         ollama_healthy=health_check_result,
         environment=config.environment,
         model=config.ollama_model,
@@ -103,18 +336,15 @@ def health():
         'status': 'healthy' if ollama_healthy else 'degraded',
         'ollama': ollama_healthy,
         'environment': config.environment,
-        'active_sessions': len(session_manager.sessions)
+        'active_sessions': session_manager.session_count
     })
 
 
 # API Endpoints for Chrome Extension
 
-@app.route('/api/session/start', methods=['POST', 'OPTIONS'])
+@app.route('/api/session/start', methods=['POST'])
 def start_session():
     """Start a new analysis session"""
-    if request.method == 'OPTIONS':
-        return '', 204
-        
     try:
         data = request.get_json()
         
@@ -127,13 +357,13 @@ def start_session():
             
         # Create session (using provided ID from extension)
         # We'll store with the extension-provided ID
-        from src.session_manager import AnalysisSession
-        session = AnalysisSession(session_id, element_data, url)
+        session = build_session(session_id, element_data, url)
+        if session is None:
+            return server_busy_response()
         
-        with session_manager.lock:
-            session_manager.sessions[session_id] = session
+        session_manager.add_session(session)
             
-        logger.info(f"Started session {session_id} for {element_data.get('type')}")
+        logger.info("Started session %s for %s", session_id, element_data.get('type'))
         
         # Get summary stats
         summary = session.get_summary_stats()
@@ -145,22 +375,20 @@ def start_session():
         })
         
     except Exception as e:
-        logger.error(f"Error starting session: {e}")
+        logger.error("Error starting session: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/quick-insights', methods=['POST', 'OPTIONS'])
+@app.route('/api/quick-insights', methods=['POST'])
 def quick_insights():
     """Generate quick insights without creating persistent session"""
-    if request.method == 'OPTIONS':
-        return '', 204
-        
     try:
         data = request.get_json()
         
         session_id = data.get('sessionId')
         element_data = data.get('data', {})
         url = data.get('url', '')
+        stream = bool(data.get('stream', False))
         
         if not element_data:
             return jsonify({'error': 'Missing data'}), 400
@@ -168,8 +396,9 @@ def quick_insights():
         data_type = element_data.get('type')
         
         # Create temporary session for analysis
-        from src.session_manager import AnalysisSession
-        temp_session = AnalysisSession(session_id, element_data, url)
+        temp_session = build_session(session_id, element_data, url)
+        if temp_session is None:
+            return server_busy_response()
         
         try:
             summary = temp_session.get_summary_stats()
@@ -190,12 +419,12 @@ def quick_insights():
 - Rows: {summary.get('row_count', 0)}
 - Columns: {summary.get('column_count', 0)}
 - Column Names: {', '.join(summary.get('columns', []))}
-- Data Types: {json.dumps(summary.get('dtypes', {}), indent=2)}
+- Data Types: {to_prompt_json(summary.get('dtypes', {}))}
 
 {stats_text}
 
 **Sample Data (first 5 rows):**
-{json.dumps(summary.get('sample_rows', []), indent=2)}
+{to_prompt_json(summary.get('sample_rows', []))}
 
 Provide brief, clear insights about patterns, trends, or notable data points.
 
@@ -207,12 +436,12 @@ Format your response in markdown with:
                 
             elif data_type in ['image', 'canvas']:
                 # For images, validate if it's a chart and analyze with vision
-                logger.info(f"Processing image/canvas data. Has image_data: {temp_session.image_data is not None}")
+                logger.info("Processing image/canvas data. Has image_data: %s", temp_session.image_data is not None)
                 
                 validation = summary.get('validation', {})
                 
                 if not validation.get('has_chart', True):
-                    logger.warning(f"Preliminary validation failed: {validation}")
+                    logger.warning("Preliminary validation failed: %s", validation)
                     return jsonify({
                         'success': False,
                         'error': 'No chart or visualization detected in image',
@@ -224,13 +453,13 @@ Format your response in markdown with:
                     logger.info("Validating image with LLM vision...")
                     alt_text = summary.get('alt', '')
                     chart_validation = ollama_client.validate_image_for_chart(
-                        temp_session.image_data, 
+                        temp_session.get_model_image(), 
                         alt_text=alt_text
                     )
-                    logger.info(f"Chart validation result: {chart_validation}")
+                    logger.info("Chart validation result: %s", chart_validation)
                     
                     if not chart_validation.get('is_chart', False):
-                        logger.warning(f"LLM says not a chart: {chart_validation}")
+                        logger.warning("LLM says not a chart: %s", chart_validation)
                         return jsonify({
                             'success': False,
                             'error': 'No chart or visualization detected in image',
@@ -257,7 +486,7 @@ Format your response in markdown with:
 - Use numbered lists for insights
 - Be specific about what you observe in the chart"""
                     
-                    image_to_send = temp_session.image_data
+                    image_to_send = temp_session.get_model_image()
                 else:
                     # Fallback without image
                     prompt = f"""Based on the metadata, provide general insights about this visualization.
@@ -270,68 +499,61 @@ Provide insights based on typical chart patterns."""
                     image_to_send = None
                 
                 # Get insights from LLM with image
-                insights_text = ""
-                for chunk in ollama_client.generate(prompt, image=image_to_send):
-                    insights_text += chunk
-                    
-                return jsonify({
-                    'success': True,
-                    'insights': insights_text,
+                extra = {
                     'summary': summary,
-                    'chart_validation': chart_validation if temp_session.image_data else None
-                })
+                    'chart_validation': chart_validation if image_to_send else None
+                }
+                return llm_response(
+                    ollama_client.generate(prompt, image=image_to_send),
+                    'insights', stream, lambda text: extra
+                )
             
             else:
                 return jsonify({'error': 'Unsupported data type'}), 400
                 
             # Get insights from LLM (for table data)
-            insights_text = ""
-            for chunk in ollama_client.generate(prompt):
-                insights_text += chunk
-                
-            return jsonify({
-                'success': True,
-                'insights': insights_text,
-                'summary': summary
-            })
+            return llm_response(
+                ollama_client.generate(prompt),
+                'insights', stream, lambda text: {'summary': summary}
+            )
             
         finally:
             # Clean up temporary session
             temp_session.close()
             
     except Exception as e:
-        logger.error(f"Error generating quick insights: {e}", exc_info=True)
+        logger.error("Error generating quick insights: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/deep-analyse', methods=['POST', 'OPTIONS'])
+@app.route('/api/deep-analyse', methods=['POST'])
+@max_body(SMALL_BODY_LIMIT)
 def deep_analyse():
     """Handle conversational analysis for ongoing sessions with data query and chart generation"""
-    if request.method == 'OPTIONS':
-        return '', 204
-        
     try:
         data = request.get_json()
         
         session_id = data.get('sessionId')
         message = data.get('message', '')
+        stream = bool(data.get('stream', False))
         
-        logger.info(f"Deep analyse request - sessionId: {session_id}, message length: {len(message)}")
+        logger.info("Deep analyse request - sessionId: %s, message length: %s", session_id, len(message))
         
         if not session_id or not message:
-            logger.error(f"Missing required fields - sessionId: {session_id}, message: {bool(message)}")
+            logger.error("Missing required fields - sessionId: %s, message: %s", session_id, bool(message))
             return jsonify({'error': 'Missing required fields'}), 400
             
         # Get session
         session = session_manager.get_session(session_id)
-        logger.info(f"Session retrieval result - session_id: {session_id}, found: {session is not None}")
+        logger.info("Session retrieval result - session_id: %s, found: %s", session_id, session is not None)
         
         if not session:
-            logger.error(f"Session not found - session_id: {session_id}, active sessions: {list(session_manager.sessions.keys())}")
+            logger.error("Session not found - session_id: %s, active sessions: %s", session_id, session_manager.session_count)
             return jsonify({'error': 'Session not found or expired'}), 404
             
         # Add user message to conversation
         session.add_conversation('user', message)
+        message_lower = message.lower()
         
         # Build context for LLM
         summary = session.get_summary_stats()
@@ -340,20 +562,11 @@ def deep_analyse():
         is_table = session.data_type == 'table' and session.df is not None
         is_image = session.data_type in ['image', 'canvas'] and session.image_data is not None
         
-        # Build conversation context
-        context = f"""You are analyzing data from a web page.
-
-Data Type: {session.data_type}
-
-Data Summary:
-{json.dumps(summary, indent=2)}
-
-Conversation History:
-"""
-        for msg in session.conversation_history[-5:]:  # Last 5 messages for context
-            role = msg['role'].capitalize()
-            content = msg['content']
-            context += f"{role}: {content}\n"
+        # Build conversation context on top of the session's invariant prompt prefix
+        context = session.get_prompt_prefix() + ''.join(
+            f"{msg['role'].capitalize()}: {msg['content']}\n"
+            for msg in session.conversation_history[-5:]  # Last 5 messages for context
+        )
         
         # For table data, use intelligent query system
         if is_table:
@@ -363,59 +576,28 @@ Conversation History:
             # Build conversation context for code generation
             conversation_context = ""
             if len(session.conversation_history) > 1:
-                conversation_context = "\n**Previous Conversation:**\n"
-                for msg in session.conversation_history[-4:]:  # Last 4 messages (2 exchanges)
-                    role = msg['role'].capitalize()
-                    content = msg['content'][:200]  # Truncate long messages
-                    conversation_context += f"{role}: {content}\n"
-                conversation_context += "\n"
+                conversation_context = "\n**Previous Conversation:**\n" + ''.join(
+                    # Last 4 messages (2 exchanges), long messages truncated
+                    f"{msg['role'].capitalize()}: {msg['content'][:200]}\n"
+                    for msg in session.conversation_history[-4:]
+                ) + "\n"
             
             # Create a focused prompt that requests executable code
-            code_prompt = f"""You are a data analysis assistant with access to a Polars DataFrame called 'df'.
-
-**Dataset Information:**
-- Rows: {summary.get('row_count', 0)}
-- Columns: {summary.get('columns', [])}
-- Sample Data (first 3 rows): {json.dumps(summary.get('sample_rows', [])[:3], indent=2)}
-
-{conversation_context}**Current User Question:** {message}
-
-**IMPORTANT Instructions:**
-1. Write Polars code to answer the question
-2. Store the final result in a variable called 'result'
-3. Return ONLY the Python code, no explanations
-4. DO NOT include import statements - 'pl' and 'df' are already available
-5. Use pl.col() for column references
-6. Handle string/numeric conversions as needed
-7. For multi-row results, use .to_dict() or select first row with [0] if needed
-8. NEVER use .item() unless you're certain the result is a single value (1x1)
+            code_prompt = (
+                f"{CODE_PROMPT_HEADER}\n\n**Dataset Information:**\n"
+                f"- Rows: {summary.get('row_count', 0)}\n"
+                f"- Columns: {summary.get('columns', [])}\n"
+                f"- Sample Data (first 3 rows): {to_prompt_json(summary.get('sample_rows', [])[:3])}\n\n"
+                f"{conversation_context}**Current User Question:** {message}\n\n"
+                f"{CODE_PROMPT_INSTRUCTIONS}Now write ONLY the code (no imports, no explanations) to answer: {message}"
+            )
 
-**Example for single value (1x1 result):**
-```python
-result = df.filter(pl.col('country') == 'India').select('gdp').item()
-```
-
-**Example for multi-row result:**
-```python
-result = df.filter(pl.col('region') == 'Asia').select(['country', 'gdp']).head(5).to_dict()
-```
-
-**Example for aggregation:**
-```python
-result = df.select(pl.col('gdp').sum()).item()
-```
-
-Now write ONLY the code (no imports, no explanations) to answer: {message}"""
-
-            # Get code from LLM
-            code_response = ""
-            for chunk in ollama_client.generate(code_prompt, stream=False):
-                code_response += chunk
+            # Get code from LLM, streamed so generation stops once the code block is complete
+            parsed = executor.parse_stream(ollama_client.generate(code_prompt))
             
-            logger.info(f"LLM code response: {code_response}")
+            logger.info("LLM code response: %s", parsed['explanation'])
             
-            # Parse and execute the code
-            parsed = executor.parse_llm_response_for_code(code_response)
+            # Execute the code
             
             result_data = None
             execution_result = None
@@ -424,9 +606,9 @@ Now write ONLY the code (no imports, no explanations) to answer: {message}"""
                 try:
                     execution_result = executor.execute_polars_code(parsed['polars_code'])
                     result_data = execution_result
-                    logger.info(f"Code executed successfully: {execution_result}")
+                    logger.info("Code executed successfully: %s", execution_result)
                 except Exception as e:
-                    logger.error(f"Error executing code: {e}")
+                    logger.error("Error executing code: %s", e)
                     result_data = {'error': str(e)}
             
             # Step 2: Generate natural language response with the actual result
@@ -439,7 +621,7 @@ Now write ONLY the code (no imports, no explanations) to answer: {message}"""
 """
             
             if execution_result and execution_result.get('success'):
-                explanation_prompt += f"**Query executed successfully. Result:**\n{json.dumps(execution_result.get('data'), indent=2)}\n\n"
+                explanation_prompt += f"**Query executed successfully. Result:**\n{result_data_json(execution_result)}\n\n"
                 explanation_prompt += "Provide a natural language answer that includes the actual data values. Be specific and cite the numbers in your response."
             else:
                 error_msg = result_data.get('error') if result_data else 'No code was generated to answer this question'
@@ -447,22 +629,21 @@ Now write ONLY the code (no imports, no explanations) to answer: {message}"""
                 explanation_prompt += "Explain the error to the user in simple terms and suggest what might be wrong or how to rephrase the question."
 
             # Get natural language explanation
-            response_text = ""
-            for chunk in ollama_client.generate(explanation_prompt):
-                response_text += chunk
+            response_chunks = ollama_client.generate(explanation_prompt)
             
             # Add error info if code execution failed (for display in UI)
             if execution_result and not execution_result.get('success'):
                 # Format error nicely for display
                 error_display = f"\n\n⚠️ **Query Error:**\n\n```\n{result_data.get('error', 'Unknown error')}\n```"
-                response_text += error_display
+                response_chunks = itertools.chain(response_chunks, [error_display])
             
-            # Check if chart would be helpful
-            chart_image = None
-            if 'chart' in message.lower() or 'plot' in message.lower() or 'visualize' in message.lower():
-                # Ask LLM for chart suggestion
-                data_summary = json.dumps(execution_result.get('data') if execution_result else {}, indent=2)
-                chart_prompt = f"""Suggest a chart specification for this data.
+            def finish(response_text: str) -> Dict[str, Any]:
+                # Check if chart would be helpful
+                chart_image = None
+                if any(keyword in message_lower for keyword in TABLE_CHART_KEYWORDS):
+                    # Ask LLM for chart suggestion
+                    data_summary = result_data_json(execution_result)
+                    chart_prompt = f"""Suggest a chart specification for this data.
 
 Question: {message}
 Data: {data_summary}
@@ -476,28 +657,23 @@ Respond with ONLY a JSON object:
   "title": "Chart Title"
 }}
 ```"""
+                    
+                    chart_response = ''.join(ollama_client.generate(chart_prompt, stream=False))
+                    
+                    chart_parsed = executor.parse_llm_response_for_code(chart_response)
+                    if chart_parsed['has_chart']:
+                        try:
+                            chart_image = session.generate_chart(chart_parsed['chart_spec'])
+                            logger.info("Generated chart successfully")
+                        except Exception as e:
+                            logger.error("Error generating chart: %s", e)
                 
-                chart_response = ""
-                for chunk in ollama_client.generate(chart_prompt, stream=False):
-                    chart_response += chunk
+                # Add to conversation
+                session.add_conversation('assistant', response_text)
                 
-                chart_parsed = executor.parse_llm_response_for_code(chart_response)
-                if chart_parsed['has_chart']:
-                    try:
-                        chart_image = session.generate_chart(chart_parsed['chart_spec'])
-                        logger.info(f"Generated chart successfully")
-                    except Exception as e:
-                        logger.error(f"Error generating chart: {e}")
-            
-            # Add to conversation
-            session.add_conversation('assistant', response_text)
+                return chart_payload(chart_image)
             
-            return jsonify({
-                'success': True,
-                'response': response_text,
-                'has_chart': bool(chart_image),
-                'chart': chart_image
-            })
+            return llm_response(response_chunks, 'response', stream, finish)
             
         elif is_image:
             # For images, use vision analysis
@@ -513,17 +689,16 @@ Format your response in markdown with:
 - Be specific about what you observe in the chart"""
             
             # Get response from LLM with image
-            response_text = ""
-            for chunk in ollama_client.generate(full_prompt, image=session.image_data):
-                response_text += chunk
+            response_chunks = ollama_client.generate(full_prompt, image=session.get_model_image())
             
-            # Check if user wants a chart generated
-            chart_image = None
-            if any(keyword in message.lower() for keyword in ['chart', 'plot', 'graph', 'visualize', 'show me']):
-                logger.info("User requested chart generation from image analysis")
-                
-                # Ask LLM to extract data and suggest chart
-                chart_request_prompt = f"""Based on the image you just analyzed and the user's question: "{message}"
+            def finish(response_text: str) -> Dict[str, Any]:
+                # Check if user wants a chart generated
+                chart_image = None
+                if any(keyword in message_lower for keyword in IMAGE_CHART_KEYWORDS):
+                    logger.info("User requested chart generation from image analysis")
+                    
+                    # Ask LLM to extract data and suggest chart
+                    chart_request_prompt = f"""Based on the image you just analyzed and the user's question: "{message}"
 
 Extract the key data points you can see in the image and suggest how to visualize them.
 
@@ -541,60 +716,47 @@ Respond ONLY with a JSON object in this format:
 ```
 
 Extract actual values from the image. Be precise with numbers."""
-                
-                chart_spec_text = ""
-                for chunk in ollama_client.generate(chart_request_prompt, image=session.image_data, stream=False):
-                    chart_spec_text += chunk
-                
-                logger.info(f"Chart specification from LLM: {chart_spec_text}")
-                
-                # Parse the chart specification
-                try:
-                    # Extract JSON from response
-                    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', chart_spec_text, re.DOTALL)
-                    if json_match:
-                        chart_spec = json.loads(json_match.group())
+                    
+                    chart_spec_text = ''.join(ollama_client.generate(chart_request_prompt, image=session.get_model_image(), stream=False))
+                    
+                    logger.info("Chart specification from LLM: %s", chart_spec_text)
+                    
+                    # Parse the chart specification
+                    try:
+                        # Extract JSON from response
+                        chart_spec = extract_json_object(chart_spec_text)
+                        if chart_spec:
                         
-                        # Generate chart using the extracted data
-                        if 'data' in chart_spec and chart_spec['data']:
-                            logger.info(f"Generating chart from extracted data: {chart_spec['data']}")
-                            
-                            # Create a temporary DataFrame from the extracted data
-                            temp_df = pl.DataFrame(chart_spec['data'])
+                            # Generate chart using the extracted data
+                            if 'data' in chart_spec and chart_spec['data']:
+                                logger.info("Generating chart from extracted data: %s", chart_spec['data'])
                             
-                            # Create chart specification for session.generate_chart
-                            chart_params = {
-                                'type': chart_spec.get('chart_type', 'bar'),
-                                'x_col': chart_spec.get('x_col'),
-                                'y_col': chart_spec.get('y_col'),
-                                'title': chart_spec.get('title', 'Chart'),
-                                'x_label': chart_spec.get('x_label'),
-                                'y_label': chart_spec.get('y_label')
-                            }
+                                # Create a temporary DataFrame from the extracted data
+                                temp_df = pl.DataFrame(chart_spec['data'])
                             
-                            # Temporarily set the DataFrame in session
-                            original_df = session.df
-                            session.df = temp_df
+                                # Create chart specification for session.generate_chart
+                                chart_params = {
+                                    'type': chart_spec.get('chart_type', 'bar'),
+                                    'x_col': chart_spec.get('x_col'),
+                                    'y_col': chart_spec.get('y_col'),
+                                    'title': chart_spec.get('title', 'Chart'),
+                                    'x_label': chart_spec.get('x_label'),
+                                    'y_label': chart_spec.get('y_label')
+                                }
                             
-                            try:
-                                chart_image = session.generate_chart(chart_params)
+                                # Plot the extracted data without touching the session's own DataFrame
+                                chart_image = session.generate_chart(chart_params, df=temp_df)
                                 logger.info("Successfully generated chart from image data")
-                            finally:
-                                # Restore original DataFrame
-                                session.df = original_df
                                 
-                except Exception as e:
-                    logger.error(f"Error generating chart from image: {e}", exc_info=True)
-            
-            # Add assistant response to conversation
-            session.add_conversation('assistant', response_text)
+                    except Exception as e:
+                        logger.error("Error generating chart from image: %s", e, exc_info=True)
+                
+                # Add assistant response to conversation
+                session.add_conversation('assistant', response_text)
+                
+                return chart_payload(chart_image)
             
-            return jsonify({
-                'success': True,
-                'response': response_text,
-                'has_chart': bool(chart_image),
-                'chart': chart_image
-            })
+            return llm_response(response_chunks, 'response', stream, finish)
         
         else:
             # Fallback for other data types
@@ -609,30 +771,23 @@ Format your response in markdown with:
 - Use **bold** for emphasis on key findings
 - Use bullet points or numbered lists for clarity"""
             
-            # Get response from LLM
-            response_text = ""
-            for chunk in ollama_client.generate(full_prompt):
-                response_text += chunk
-            
-            # Add assistant response to conversation
-            session.add_conversation('assistant', response_text)
+            def finish(response_text: str) -> Dict[str, Any]:
+                # Add assistant response to conversation
+                session.add_conversation('assistant', response_text)
+                return {}
             
-            return jsonify({
-                'success': True,
-                'response': response_text
-            })
+            # Get response from LLM
+            return llm_response(ollama_client.generate(full_prompt), 'response', stream, finish)
         
     except Exception as e:
-        logger.error(f"Error in deep analyse: {e}", exc_info=True)
+        logger.error("Error in deep analyse: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/session/end', methods=['POST', 'OPTIONS'])
+@app.route('/api/session/end', methods=['POST'])
+@max_body(SMALL_BODY_LIMIT)
 def end_session():
     """End an analysis session"""
-    if request.method == 'OPTIONS':
-        return '', 204
-        
     try:
         data = request.get_json()
         session_id = data.get('sessionId')
@@ -648,26 +803,10 @@ def end_session():
         })
         
     except Exception as e:
-        logger.error(f"Error ending session: {e}")
+        logger.error("Error ending session: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
-def format_sample_rows(rows: list, columns: list) -> str:
-    """Format sample rows for display in prompt"""
-    if not rows or not columns:
-        return "No data available"
-        
-    # Create a simple text table
-    result = []
-    result.append(' | '.join(columns))
-    result.append('-' * (len(' | '.join(columns))))
-    
-    for row in rows[:5]:  # Max 5 rows
-        result.append(' | '.join(str(cell) for cell in row))
-        
-    return '\n'.join(result)
-
-
 # Original endpoints for web interface
 
 @app.route('/analyze', methods=['POST'])
@@ -687,23 +826,14 @@ def analyze():
         if image is None:
             return jsonify({'error': 'Invalid image data'}), 400
     
-    def generate():
-        """Generator function for streaming response."""
-        try:
-            for chunk in ollama_client.generate(prompt, image=image):
-                # Send each chunk as a JSON object
-                yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-            
-            # Send completion signal
-            yield f"data: {json.dumps({'done': True})}\n\n"
-            
-        except Exception as e:
-            logger.error(f"Error during analysis: {str(e)}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
-    
-    return Response(generate(), mimetype='text/event-stream')
+    return stream_events(ollama_client.generate(prompt, image=image))
 
 
 def create_app():
-    """Application factory function."""
+    """
+    Application factory function.
+    
+    Sessions are held in this process, so run a single gunicorn worker and
+    scale with gthread threads rather than extra worker processes.
+    """
     return app
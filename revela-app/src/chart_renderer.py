@@ -0,0 +1,77 @@
+"""
+Chart rendering for Revela
+Draws matplotlib charts (Agg canvas) inline or on a small process pool
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence
+
+from src.chart_worker import CHART_FORMATS, render_chart
+from src.config_module import config
+
+logger = logging.getLogger(__name__)
+
+
+class ChartRenderer:
+    """
+    Runs render_chart inline or on a process pool.
+
+    Matplotlib drawing is pure-Python and CPU bound, so under the threaded
+    server concurrent charts serialise on the GIL. With processes > 0 they are
+    drawn in separate worker processes instead. The pool is started on first
+    use and falls back to inline rendering if a worker dies. Workers unpickle
+    render_chart from src.chart_worker, which loads nothing but matplotlib.
+    """
+
+    def __init__(self, processes: int = 0, image_format: str = 'png'):
+        if image_format not in CHART_FORMATS:
+            logger.warning(f"Unsupported chart format {image_format!r}, using png")
+            image_format = 'png'
+        self.processes = max(0, processes)
+        self.image_format = image_format
+        self.mime_type = CHART_FORMATS[image_format][0]
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if not self.processes:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: forking a multi-threaded server can copy held locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Started chart render pool with {self.processes} processes")
+            return self._pool
+
+    def render(self, chart_type: str, x_data: Optional[Sequence], y_data: Optional[Sequence],
+               title: str, x_label: Optional[str], y_label: Optional[str]) -> bytes:
+        """Render a chart to image bytes (see mime_type), on the pool when one is configured."""
+        args = (chart_type, x_data, y_data, title, x_label, y_label, self.image_format)
+        pool = self._get_pool()
+        if pool is None:
+            return render_chart(*args)
+        try:
+            return pool.submit(render_chart, *args).result()
+        except BrokenProcessPool:
+            logger.warning("Chart render pool broke, rendering inline from now on")
+            self.shutdown()
+            self.processes = 0
+            return render_chart(*args)
+
+    def shutdown(self):
+        """Stop the worker processes, if any were started."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Global chart renderer instance
+chart_renderer = ChartRenderer(config.chart_render_processes, config.chart_format)
@@ -4,47 +4,77 @@ Handles environment variables and Cloud Run OIDC token generation.
 """
 import os
 import logging
+import threading
+import time
 from typing import Optional
 from dotenv import load_dotenv
 import google.auth
+import google.auth.jwt
 from google.auth.transport.requests import Request
 import google.oauth2.id_token
 
-# Configure logging
+# Load environment variables
+load_dotenv()
+
+# Configure logging (single place for the whole app; LOG_LEVEL overrides the default).
+# An unknown level name falls back to INFO rather than failing every worker at import.
+_log_level = (os.getenv("LOG_LEVEL") or "INFO").upper()
+_log_level_valid = _log_level in logging.getLevelNamesMapping()
 logging.basicConfig(
-    level=logging.INFO,
+    level=_log_level if _log_level_valid else logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-# Load environment variables
-load_dotenv()
+if not _log_level_valid:
+    logger.warning(f"Unknown LOG_LEVEL {_log_level!r}, using INFO")
 
 
 class Config:
     """Application configuration manager."""
     
+    # Refresh the cached OIDC token this many seconds before it expires
+    TOKEN_REFRESH_MARGIN = 300
+    
     def __init__(self):
         self.environment = os.getenv("ENVIRONMENT", "local")
         self.ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
         self.ollama_model = os.getenv("OLLAMA_MODEL", "gemma3:12b-it-qat")
+        # Per-request keep_alive; unset leaves the Ollama server default in charge
+        self.ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE") or None
+        self.response_cache_size = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+        self.response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+        # Optional Redis URL; when set, LLM responses are cached in Redis and shared across replicas
+        self.redis_url = os.getenv("REDIS_URL") or None
+        # Worker processes for chart rendering; 0 renders inline on the request thread
+        self.chart_render_processes = int(os.getenv("CHART_RENDER_PROCESSES", "0"))
+        # Memory cap (bytes) for parsed tables reused across sessions with identical HTML; 0 disables
+        self.table_cache_max_bytes = int(os.getenv("TABLE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        # Image format for generated charts: webp (smaller) or png
+        self.chart_format = os.getenv("CHART_FORMAT", "webp").lower()
+        
+        # Environment checks run on every request, so resolve them once
+        self.is_production = self.environment.lower() == "production"
+        self.is_local = self.environment.lower() == "local"
+        
+        # Cached OIDC token and its expiry (epoch seconds)
+        self._token: Optional[str] = None
+        self._token_expiry = 0.0
+        self._token_lock = threading.Lock()
         
         # Log configuration on initialization
-        logger.info(f"=== Configuration Initialized ===")
-        logger.info(f"Environment: {self.environment}")
-        logger.info(f"Ollama Host: {self.ollama_host}")
-        logger.info(f"Ollama Model: {self.ollama_model}")
-        logger.info(f"Is Production: {self.is_production}")
-    
-    @property
-    def is_production(self) -> bool:
-        """Check if running in production environment."""
-        return self.environment.lower() == "production"
-    
-    @property
-    def is_local(self) -> bool:
-        """Check if running in local environment."""
-        return self.environment.lower() == "local"
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"=== Configuration Initialized ===")
+            logger.info(f"Environment: {self.environment}")
+            logger.info(f"Ollama Host: {self.ollama_host}")
+            logger.info(f"Ollama Model: {self.ollama_model}")
+            logger.info(f"Ollama Keep Alive: {self.ollama_keep_alive}")
+            logger.info(f"Response Cache Size: {self.response_cache_size}")
+            logger.info(f"Response Cache TTL: {self.response_cache_ttl}s")
+            logger.info(f"Redis Cache: {'enabled' if self.redis_url else 'disabled'}")
+            logger.info(f"Chart Render Processes: {self.chart_render_processes}")
+            logger.info(f"Chart Format: {self.chart_format}")
+            logger.info(f"Table Cache Max Bytes: {self.table_cache_max_bytes}")
+            logger.info(f"Is Production: {self.is_production}")
     
     def get_ollama_url(self) -> str:
         """Get the appropriate Ollama URL based on environment."""
@@ -53,23 +83,46 @@ class Config:
     def get_auth_token(self) -> Optional[str]:
         """
         Get authentication token for Cloud Run service invocation.
+        The token is cached and only re-fetched shortly before it expires.
         Returns None for local environment.
         """
         if self.is_local:
-            logger.info("Running in local mode, skipping authentication")
+            logger.debug("Running in local mode, skipping authentication")
             return None
         
+        with self._token_lock:
+            if self._token and time.time() < self._token_expiry - self.TOKEN_REFRESH_MARGIN:
+                return self._token
+            
+            try:
+                logger.info(f"Fetching OIDC token for target audience: {self.ollama_host}")
+                # Get the OIDC token for Cloud Run to Cloud Run invocation
+                auth_req = Request()
+                target_audience = self.ollama_host
+                id_token = google.oauth2.id_token.fetch_id_token(auth_req, target_audience)
+                self._token = id_token
+                self._token_expiry = self._get_token_expiry(id_token)
+                logger.info("Successfully fetched OIDC token")
+                return id_token
+            except Exception as e:
+                logger.error(f"Error fetching OIDC token: {e}", exc_info=True)
+                return None
+    
+    def invalidate_auth_token(self):
+        """Drop the cached OIDC token so the next request fetches a fresh one."""
+        with self._token_lock:
+            self._token = None
+            self._token_expiry = 0.0
+    
+    @staticmethod
+    def _get_token_expiry(token: str) -> float:
+        """Read the exp claim from an ID token, defaulting to one hour from now."""
         try:
-            logger.info(f"Fetching OIDC token for target audience: {self.ollama_host}")
-            # Get the OIDC token for Cloud Run to Cloud Run invocation
-            auth_req = Request()
-            target_audience = self.ollama_host
-            id_token = google.oauth2.id_token.fetch_id_token(auth_req, target_audience)
-            logger.info("Successfully fetched OIDC token")
-            return id_token
+            claims = google.auth.jwt.decode(token, verify=False)
+            return float(claims["exp"])
         except Exception as e:
-            logger.error(f"Error fetching OIDC token: {e}", exc_info=True)
-            return None
+            logger.warning(f"Could not read OIDC token expiry: {e}")
+            return time.time() + 3600
     
     def get_headers(self) -> dict:
         """Get HTTP headers with authentication if needed."""
@@ -78,15 +131,15 @@ class Config:
         }
         
         if self.is_production:
-            logger.info("Production mode: Adding authentication header")
+            logger.debug("Production mode: Adding authentication header")
             token = self.get_auth_token()
             if token:
                 headers["Authorization"] = f"Bearer {token}"
-                logger.info("Authorization header added successfully")
+                logger.debug("Authorization header added successfully")
             else:
                 logger.warning("Failed to get auth token, proceeding without authentication")
         else:
-            logger.info("Non-production mode: Skipping authentication")
+            logger.debug("Non-production mode: Skipping authentication")
         
         return headers
 
@@ -3,14 +3,206 @@ LLM Code Executor for Revela
 Safely executes LLM-generated Polars queries and chart generation code
 """
 
+import ast
+import functools
 import logging
-import json
-import re
-from typing import Dict, Any, Optional
+from types import CodeType
+from typing import Dict, Any, Iterable, Optional
+import orjson
 import polars as pl
 
 logger = logging.getLogger(__name__)
 
+CODE_FENCE = '```'
+
+# Builtins visible to LLM-generated code; shared read-only by every execution
+SAFE_BUILTINS: Dict[str, Any] = {
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'len': len,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'set': set,
+    'sum': sum,
+    'max': max,
+    'min': min,
+    'round': round,
+    'sorted': sorted,
+    'enumerate': enumerate,
+    'range': range,
+    'zip': zip,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+
+# Static instructions and examples closing generate_query_prompt
+QUERY_PROMPT_INSTRUCTIONS = """**Instructions:**
+1. Analyze the question and determine if it requires data manipulation
+2. If yes, write Polars code to answer the question
+3. Store the result in a variable called `result`
+4. If a chart would help visualize the answer, provide chart specifications in JSON format
+
+**Polars Code Format:**
+```python
+# Your Polars code here using the 'df' DataFrame
+result = df.filter(...).select(...).group_by(...)
+```
+
+**Chart Specification Format (if needed):**
+```json
+{
+  "type": "bar|line|scatter|pie|hist",
+  "x_col": "column_name",
+  "y_col": "column_name",
+  "title": "Chart Title"
+}
+```
+
+**Example Response:**
+To find the average age by department, I'll group the data:
+
+```python
+result = df.group_by('department').agg(pl.col('age').mean().alias('avg_age'))
+```
+
+This shows the average age is highest in Engineering.
+
+```json
+{
+  "type": "bar",
+  "x_col": "department",
+  "y_col": "avg_age",
+  "title": "Average Age by Department"
+}
+```
+
+Now answer the user's question:"""
+
+# Successful query results remembered per session
+QUERY_RESULT_CACHE_SIZE = 64
+
+
+def to_prompt_json(obj: Any) -> str:
+    """
+    Serialize an object as indented JSON for an LLM prompt.
+    
+    orjson is several times faster than the stdlib encoder, keeps non-ASCII
+    text as-is and handles dates; other unknown values fall back to str().
+    """
+    return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+
+def result_data_json(result: Optional[Dict[str, Any]]) -> str:
+    """
+    Return the data of an execute_polars_code result as JSON for a prompt.
+    
+    DataFrame results already carry their rows as JSON written by Polars.
+    """
+    if not result:
+        return to_prompt_json({})
+    if 'data_json' in result:
+        return result['data_json']
+    return to_prompt_json(result.get('data'))
+
+
+def extract_fenced_blocks(text: str) -> Dict[str, str]:
+    """
+    Return the body of the first fenced block for each language tag in text.
+    
+    A single left-to-right str.find walk over the fences; an unterminated
+    final block is ignored.
+    """
+    blocks: Dict[str, str] = {}
+    start = text.find(CODE_FENCE)
+    while start != -1:
+        tag_end = text.find('\n', start + len(CODE_FENCE))
+        if tag_end == -1:
+            break
+        end = text.find(CODE_FENCE, tag_end + 1)
+        if end == -1:
+            break
+        lang = text[start + len(CODE_FENCE):tag_end].strip().lower()
+        blocks.setdefault(lang, text[tag_end + 1:end])
+        start = text.find(CODE_FENCE, end + len(CODE_FENCE))
+    return blocks
+
+
+def read_until_block(chunks: Iterable[str], lang: str) -> str:
+    """
+    Accumulate streamed LLM output until the first fenced block tagged lang closes.
+    
+    The rest of the stream is abandoned, and closing a generator from the Ollama
+    client ends the upstream request, so callers can act on the block without
+    waiting for trailing commentary. Returns everything read, which is the whole
+    response when no such block appears.
+    """
+    text = ''
+    # Incremental fence scan: pos is where the next search starts, fence and
+    # tag_end locate the opening fence and tag line of the block being read
+    # (-1 until seen), so each chunk only searches newly appended text
+    pos = 0
+    fence = tag_end = -1
+    found = False
+    try:
+        for chunk in chunks:
+            text += chunk
+            while True:
+                if fence == -1:
+                    fence = text.find(CODE_FENCE, pos)
+                    if fence == -1:
+                        # Back off so a fence split across chunks is still seen
+                        pos = max(pos, len(text) - len(CODE_FENCE) + 1)
+                        break
+                if tag_end == -1:
+                    tag_end = text.find('\n', fence + len(CODE_FENCE))
+                    if tag_end == -1:
+                        break
+                    pos = tag_end + 1
+                end = text.find(CODE_FENCE, pos)
+                if end == -1:
+                    pos = max(pos, len(text) - len(CODE_FENCE) + 1)
+                    break
+                if text[fence + len(CODE_FENCE):tag_end].strip().lower() == lang:
+                    found = True
+                    break
+                pos = end + len(CODE_FENCE)
+                fence = tag_end = -1
+            if found:
+                break
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+    return text
+
+
+@functools.lru_cache(maxsize=128)
+def compile_llm_code(code: str) -> CodeType:
+    """
+    Validate and compile LLM-generated code, reusing the code object for
+    repeated identical snippets.
+    
+    Imports and dunder names or attributes (the usual routes out of the
+    restricted builtins, e.g. ().__class__.__subclasses__()) are rejected.
+    
+    Raises:
+        SyntaxError: If the code does not parse
+        ValueError: If the code uses a disallowed construct
+    """
+    tree = ast.parse(code, mode='exec')
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal)):
+            raise ValueError(f"{type(node).__name__} statements are not allowed")
+        if isinstance(node, ast.Attribute) and node.attr.startswith('__'):
+            raise ValueError(f"Access to '{node.attr}' is not allowed")
+        if isinstance(node, ast.Name) and node.id.startswith('__'):
+            raise ValueError(f"Use of '{node.id}' is not allowed")
+    return compile(tree, '<llm-code>', 'exec')
+
 
 class CodeExecutor:
     """Safely execute LLM-generated data analysis code"""
@@ -41,29 +233,42 @@ class CodeExecutor:
             'explanation': llm_response
         }
         
-        # Extract Python code blocks
-        code_pattern = r'```python\n(.*?)```'
-        code_matches = re.findall(code_pattern, llm_response, re.DOTALL)
+        blocks = extract_fenced_blocks(llm_response)
         
-        if code_matches:
+        # Extract the first Python code block
+        code_block = blocks.get('python')
+        
+        if code_block is not None:
             result['has_code'] = True
-            result['polars_code'] = code_matches[0].strip()
+            result['polars_code'] = code_block.strip()
         
-        # Extract JSON chart specifications
-        chart_pattern = r'```json\n(.*?)```'
-        chart_matches = re.findall(chart_pattern, llm_response, re.DOTALL)
+        # Extract the first JSON chart specification
+        chart_block = blocks.get('json')
         
-        if chart_matches:
+        if chart_block is not None:
             try:
-                chart_spec = json.loads(chart_matches[0].strip())
+                chart_spec = orjson.loads(chart_block.strip())
                 if 'type' in chart_spec:  # Validate it's a chart spec
                     result['has_chart'] = True
                     result['chart_spec'] = chart_spec
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.warning("Failed to parse chart specification JSON")
         
         return result
     
+    def parse_stream(self, chunks: Iterable[str]) -> Dict[str, Any]:
+        """
+        Parse a streamed LLM response for code, stopping once the first Python
+        block is complete.
+        
+        Args:
+            chunks: Text chunks as yielded by OllamaClient.generate
+            
+        Returns:
+            Same structure as parse_llm_response_for_code
+        """
+        return self.parse_llm_response_for_code(read_until_block(chunks, 'python'))
+    
     def execute_polars_code(self, code: str) -> Dict[str, Any]:
         """
         Safely execute Polars query code.
@@ -93,62 +298,65 @@ class CodeExecutor:
             code = '\n'.join(cleaned_lines)
             logger.info(f"Cleaned code to execute: {code}")
             
+            cached = self.session.query_results.get(code)
+            if cached is not None:
+                logger.info("Reusing result of an identical query")
+                return cached
+            
             # Create safe execution environment
             safe_globals = {
                 'pl': pl,
                 'df': self.df,
-                '__builtins__': {
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'bool': bool,
-                    'len': len,
-                    'list': list,
-                    'dict': dict,
-                    'tuple': tuple,
-                    'set': set,
-                    'sum': sum,
-                    'max': max,
-                    'min': min,
-                    'round': round,
-                    'sorted': sorted,
-                    'enumerate': enumerate,
-                    'range': range,
-                    'zip': zip,
-                    'True': True,
-                    'False': False,
-                    'None': None,
-                }
+                '__builtins__': SAFE_BUILTINS
             }
             
             # Execute code
             local_vars = {}
-            exec(code, safe_globals, local_vars)
+            exec(compile_llm_code(code), safe_globals, local_vars)
             
             # Get result DataFrame or value
             result_df = local_vars.get('result', None)
             
+            # Lazy queries (df.lazy()...) run through the optimizer only here,
+            # with predicate/projection pushdown across the whole chain
+            if isinstance(result_df, pl.LazyFrame):
+                result_df = result_df.collect()
+            
             if isinstance(result_df, pl.DataFrame):
-                return {
+                result = {
                     'success': True,
                     'type': 'dataframe',
-                    'data': result_df.head(100).to_dicts(),  # Limit to 100 rows
+                    # Serialized by Polars in Rust rather than via 100 Python row dicts
+                    'data_json': result_df.head(100).write_json(),  # Limit to 100 rows
                     'shape': {'rows': result_df.height, 'columns': result_df.width},
                     'columns': result_df.columns
                 }
             elif result_df is not None:
-                return {
+                result = {
                     'success': True,
                     'type': 'value',
                     'data': str(result_df)
                 }
             else:
                 return {'error': 'No result variable found in executed code'}
+            
+            self._remember_result(code, result)
+            return result
                 
         except Exception as e:
             logger.error(f"Error executing Polars code: {e}", exc_info=True)
             return {'error': f'Execution error: {str(e)}'}
     
+    def _remember_result(self, code: str, result: Dict[str, Any]):
+        """Cache a successful result on the session, evicting the oldest if full."""
+        results = self.session.query_results
+        results[code] = result
+        while len(results) > QUERY_RESULT_CACHE_SIZE:
+            try:
+                results.popitem(last=False)
+            except KeyError:
+                break
+    
     def generate_query_prompt(self, user_question: str, df_summary: Dict[str, Any]) -> str:
         """
         Generate prompt for LLM to create Polars query code.
@@ -167,55 +375,15 @@ class CodeExecutor:
 - Columns: {', '.join(df_summary.get('columns', []))}
 
 **Column Data Types:**
-{json.dumps(df_summary.get('dtypes', {}), indent=2)}
+{to_prompt_json(df_summary.get('dtypes', {}))}
 
 **Sample Data (first 5 rows):**
-{json.dumps(df_summary.get('sample_rows', []), indent=2)}
+{to_prompt_json(df_summary.get('sample_rows', []))}
 
 **User Question:**
 {user_question}
 
-**Instructions:**
-1. Analyze the question and determine if it requires data manipulation
-2. If yes, write Polars code to answer the question
-3. Store the result in a variable called `result`
-4. If a chart would help visualize the answer, provide chart specifications in JSON format
-
-**Polars Code Format:**
-```python
-# Your Polars code here using the 'df' DataFrame
-result = df.filter(...).select(...).group_by(...)
-```
-
-**Chart Specification Format (if needed):**
-```json
-{{
-  "type": "bar|line|scatter|pie|hist",
-  "x_col": "column_name",
-  "y_col": "column_name",
-  "title": "Chart Title"
-}}
-```
-
-**Example Response:**
-To find the average age by department, I'll group the data:
-
-```python
-result = df.group_by('department').agg(pl.col('age').mean().alias('avg_age'))
-```
-
-This shows the average age is highest in Engineering.
-
-```json
-{{
-  "type": "bar",
-  "x_col": "department",
-  "y_col": "avg_age",
-  "title": "Average Age by Department"
-}}
-```
-
-Now answer the user's question:"""
+{QUERY_PROMPT_INSTRUCTIONS}"""
         
         return prompt
 
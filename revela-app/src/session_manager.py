@@ -3,23 +3,90 @@ Session Manager for Revela
 Manages ephemeral analysis sessions with Polars DataFrames for advanced analytics
 """
 
+import numpy as np
 import polars as pl
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
 import logging
+import re
 import threading
-from typing import Dict, Optional, Any, List
-from datetime import datetime, timedelta
-import uuid
+import time
+from typing import Dict, Optional, Any, List, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import secrets
 from html.parser import HTMLParser
+import lxml.html
 import io
-import base64
-import json
+import hashlib
+import pybase64
+import requests
 from PIL import Image
 
+from src.llm_code_executor import to_prompt_json
+from src.ollama_client import ollama_client
+from src.chart_renderer import chart_renderer
+from src.config_module import config
+
 logger = logging.getLogger(__name__)
 
+# Characters dropped from column names; \w is exactly str.isalnum() plus '_'
+NON_WORD_CHARS = re.compile(r'\W+')
+
+# Seconds a parsed table stays reusable by new sessions (see TableCache)
+TABLE_CACHE_TTL = 600
+
+# Largest image kept in memory per session; the LLM input is 896x896 anyway.
+# Keep in sync with MAX_IMAGE_DIMENSION in chrome-extension/src/content/content.js
+MAX_IMAGE_SIZE = (1024, 1024)
+
+# Independently locked stripes of the session map (a power of two)
+SESSION_SHARDS = 16
+
+# Pooled HTTP session for fetching page images by URL, so repeat fetches from
+# the same site reuse a kept-alive connection instead of a new TCP/TLS handshake
+image_http = requests.Session()
+
+# Largest image body read when fetching by URL; bigger downloads are abandoned
+MAX_IMAGE_DOWNLOAD_BYTES = 10 * 1024 * 1024
+
+
+def fetch_image_bytes(url: str, headers: Dict[str, str]) -> bytes:
+    """
+    Download an image body in chunks, refusing anything over MAX_IMAGE_DOWNLOAD_BYTES.
+    
+    The body is streamed rather than buffered whole, so an oversized (or
+    endless) response is cut off at the cap instead of filling memory.
+    """
+    with image_http.get(url, timeout=10, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > MAX_IMAGE_DOWNLOAD_BYTES:
+            raise ValueError(f"Image too large: {declared} bytes")
+        
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            buffer += chunk
+            if len(buffer) > MAX_IMAGE_DOWNLOAD_BYTES:
+                raise ValueError(f"Image larger than {MAX_IMAGE_DOWNLOAD_BYTES} bytes")
+        return bytes(buffer)
+
+
+def load_image(image_bytes: bytes) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Decode image bytes once into a bounded, RGB in-memory image.
+    
+    JPEGs are draft-decoded at reduced scale, larger images are downsized to
+    MAX_IMAGE_SIZE, and the source buffer is released after decoding.
+    Returns the image and the original (width, height) before downsizing.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        original_size = img.size
+        img.draft('RGB', MAX_IMAGE_SIZE)
+        img.load()
+        if img.width > MAX_IMAGE_SIZE[0] or img.height > MAX_IMAGE_SIZE[1]:
+            img.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
+        image = img.convert('RGB') if img.mode != 'RGB' else img.copy()
+        return image, original_size
+
 
 class HTMLTableParser(HTMLParser):
     """Parse HTML table into structured data"""
@@ -70,19 +137,134 @@ class HTMLTableParser(HTMLParser):
         return self.tables
 
 
+def parse_html_tables(html_content: str, max_tables: Optional[int] = None) -> List[List[List[str]]]:
+    """
+    Extract the non-empty tables of an HTML fragment as rows of stripped cell text.
+    
+    Parsed with lxml's C parser; HTMLTableParser is kept as a fallback for
+    markup lxml rejects. With max_tables, extraction stops once that many
+    tables are found, so cells of later tables are never copied out.
+    """
+    if not html_content or not html_content.strip():
+        return []
+    try:
+        doc = lxml.html.fromstring(html_content)
+    except Exception as e:
+        logger.warning(f"lxml could not parse table HTML, falling back to HTMLParser: {e}")
+        parser = HTMLTableParser()
+        parser.feed(html_content)
+        return parser.get_tables()[:max_tables]
+    
+    tables = []
+    for table in doc.iter('table'):
+        rows = [
+            [cell.text_content().strip() for cell in row.iterchildren('td', 'th')]
+            for row in table.iter('tr')
+        ]
+        rows = [row for row in rows if row]
+        if rows:
+            tables.append(rows)
+            if len(tables) == max_tables:
+                break
+    return tables
+
+
+class TableCache:
+    """
+    Thread-safe LRU cache of parsed table frames, bounded by their memory size.
+    
+    Lets a session started with the same table HTML as a recent one (e.g. quick
+    insights followed by a chat on the same element, or a page refresh) skip
+    parsing and casting. Entries hold the string frame and its Float64 cast,
+    sized with estimated_size(); least recently used entries are evicted once
+    the total passes max_bytes. Cached frames share column buffers with the
+    sessions built from them, so max_bytes also bounds how much table memory
+    can outlive its sessions, for at most ttl_seconds.
+    """
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float = TABLE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, size, df, df_numeric), least recently used first
+        self._entries: "OrderedDict[bytes, Tuple[float, int, pl.DataFrame, pl.DataFrame]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[Tuple[pl.DataFrame, pl.DataFrame]]:
+        """Return clones of the cached (df, df_numeric), or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, df, df_numeric = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._total_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+        # clone() is a cheap copy sharing the column buffers; each session
+        # still gets frame objects of its own
+        return df.clone(), df_numeric.clone()
+    
+    def set(self, key: bytes, df: pl.DataFrame, df_numeric: pl.DataFrame):
+        """Store a table's frames, evicting least recently used tables to stay under max_bytes."""
+        size = df.estimated_size() + df_numeric.estimated_size()
+        if size > self.max_bytes:
+            return  # Also covers max_bytes <= 0 (cache disabled)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, df.clone(), df_numeric.clone())
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+    
+    def clear(self):
+        """Drop all cached tables."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+# Global parsed-table cache shared by all sessions
+table_cache = TableCache(max_bytes=config.table_cache_max_bytes)
+
+
 class AnalysisSession:
     """Represents a single ephemeral analysis session with Polars DataFrame"""
     
+    # Fixed attribute set: no per-instance __dict__ for up to max_sessions sessions
+    __slots__ = (
+        'session_id', 'data', 'url', 'created_at', 'last_accessed', 'df', 'df_numeric',
+        'data_type', 'conversation_history', 'image_data', 'image_metadata', '_model_image',
+        'query_results', '_prompt_prefix', '_summary_stats',
+    )
+    
+    # Conversation messages kept per session; prompts only use the last few
+    MAX_CONVERSATION_MESSAGES = 50
+    
     def __init__(self, session_id: str, data: Dict[str, Any], url: str):
         self.session_id = session_id
         self.data = data
         self.url = url
         self.created_at = datetime.now()
-        self.last_accessed = datetime.now()
+        # Monotonic seconds; only ever compared against other monotonic readings
+        self.last_accessed = time.monotonic()
         self.df: Optional[pl.DataFrame] = None
+        # Every column of df cast to Float64 (null where not numeric), for stats and charts
+        self.df_numeric: Optional[pl.DataFrame] = None
         self.data_type = data.get('type', 'unknown')
         self.conversation_history = []
         self.image_data: Optional[Image.Image] = None
+        self._model_image: Optional[bytes] = None
+        self.image_metadata: Dict[str, Any] = {}
+        # Cleaned query code -> successful execution result; the DataFrame never
+        # changes after loading, so a repeated query can reuse its result
+        self.query_results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._prompt_prefix: Optional[str] = None
+        self._summary_stats: Optional[Dict[str, Any]] = None
         
         # Initialize data based on type
         if self.data_type == 'table':
@@ -93,12 +275,21 @@ class AnalysisSession:
     def _load_table_data(self):
         """Parse HTML table and load into Polars DataFrame"""
         try:
-            html_content = self.data.get('html', '')
+            # Take the markup out of the request data, as with imageData, so the
+            # session does not keep the page HTML alive next to the DataFrame
+            html_content = self.data.pop('html', '')
+            
+            # Same markup as a recent session: reuse its frames instead of parsing
+            cache_key = hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).digest()
+            cached = table_cache.get(cache_key)
+            if cached is not None:
+                self.df, self.df_numeric = cached
+                logger.info(f"Reused cached table with {self.df.height} rows and {self.df.width} columns for session {self.session_id}")
+                return
             
-            # Parse HTML table
-            parser = HTMLTableParser()
-            parser.feed(html_content)
-            tables = parser.get_tables()
+            # Parse HTML table; only the first one is used
+            tables = parse_html_tables(html_content, max_tables=1)
+            del html_content
             
             if not tables:
                 logger.warning(f"No tables found in HTML for session {self.session_id}")
@@ -115,40 +306,39 @@ class AnalysisSession:
             headers = table_data[0]
             rows = table_data[1:]
             
-            # Clean headers (make them valid column names)
-            clean_headers = []
+            # Clean headers into valid, unique column names in one pass; repeats
+            # get _1, _2, ... and the suffix is bumped past any name already taken
+            seen: Dict[str, int] = {}
+            unique_headers = []
             for i, header in enumerate(headers):
-                clean_header = str(header).strip().replace(' ', '_').replace('-', '_')
-                clean_header = ''.join(c for c in clean_header if c.isalnum() or c == '_')
+                clean_header = NON_WORD_CHARS.sub('', str(header).strip().replace(' ', '_').replace('-', '_'))
                 if not clean_header or clean_header[0].isdigit():
                     clean_header = f'column_{i}'
-                clean_headers.append(clean_header.lower())
-            
-            # Ensure unique headers
-            seen = {}
-            unique_headers = []
-            for header in clean_headers:
-                if header in seen:
-                    seen[header] += 1
-                    unique_headers.append(f"{header}_{seen[header]}")
-                else:
-                    seen[header] = 0
-                    unique_headers.append(header)
-            
-            # Create dictionary for DataFrame
-            data_dict = {header: [] for header in unique_headers}
-            
-            for row in rows:
-                # Pad or truncate row to match header count
-                padded_row = list(row)[:len(unique_headers)]
-                while len(padded_row) < len(unique_headers):
-                    padded_row.append('')
-                    
-                for header, value in zip(unique_headers, padded_row):
-                    data_dict[header].append(value)
+                clean_header = clean_header.lower()
+                
+                name = clean_header
+                while name in seen:
+                    seen[clean_header] += 1
+                    name = f"{clean_header}_{seen[clean_header]}"
+                seen[name] = 0
+                unique_headers.append(name)
+            
+            # Pad or truncate rows to the header count, then transpose once so
+            # Polars builds each column directly; every cell is text, so the
+            # explicit schema skips dtype inference
+            width = len(unique_headers)
+            fixed_rows = [(row + [''] * (width - len(row)))[:width] for row in rows]
+            columns = list(zip(*fixed_rows))
             
             # Create Polars DataFrame
-            self.df = pl.DataFrame(data_dict)
+            self.df = pl.DataFrame(
+                {header: list(column) for header, column in zip(unique_headers, columns)},
+                schema={header: pl.Utf8 for header in unique_headers}
+            )
+            
+            # Cast to numbers once; summaries and every chart reuse this
+            self.df_numeric = self.df.select(pl.all().cast(pl.Float64, strict=False))
+            table_cache.set(cache_key, self.df, self.df_numeric)
             
             logger.info(f"Created Polars DataFrame with {self.df.height} rows and {self.df.width} columns for session {self.session_id}")
             
@@ -173,21 +363,24 @@ class AnalysisSession:
             
             # If base64 image data is provided, decode it
             if 'imageData' in self.data and self.data['imageData']:
-                image_data = self.data['imageData']
+                # Take the payload out of the request data so the session does not
+                # keep the multi-megabyte base64 string alive next to the image
+                image_data = self.data.pop('imageData')
                 logger.info(f"Found imageData field, length: {len(image_data)}")
                 
                 if image_data.startswith('data:image'):
-                    image_data = image_data.split(',')[1]
+                    image_data = image_data.partition(',')[2]
                 
-                image_bytes = base64.b64decode(image_data)
-                self.image_data = Image.open(io.BytesIO(image_bytes))
+                image_bytes = pybase64.b64decode(image_data, validate=False)
+                del image_data
+                self.image_data, original_size = load_image(image_bytes)
+                del image_bytes
+                self.image_metadata['original_size'] = original_size
                 logger.info(f"Successfully loaded image data from base64: {self.image_data.size}")
             elif 'src' in self.data and self.data['src']:
                 # If no imageData but src is available, fetch from URL
                 logger.info(f"No imageData provided, attempting to fetch from URL: {self.data['src']}")
                 try:
-                    import requests
-                    
                     # Add headers to avoid being blocked by websites
                     headers = {
                         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -196,9 +389,8 @@ class AnalysisSession:
                         'Referer': self.url if self.url else 'https://www.google.com/'
                     }
                     
-                    response = requests.get(self.data['src'], timeout=10, headers=headers)
-                    response.raise_for_status()
-                    self.image_data = Image.open(io.BytesIO(response.content))
+                    self.image_data, original_size = load_image(fetch_image_bytes(self.data['src'], headers))
+                    self.image_metadata['original_size'] = original_size
                     logger.info(f"Successfully fetched image from URL: {self.image_data.size}")
                 except Exception as e:
                     logger.error(f"Failed to fetch image from URL: {e}", exc_info=True)
@@ -215,8 +407,8 @@ class AnalysisSession:
             return {'has_chart': False, 'reason': 'No image data available'}
         
         try:
-            # Basic validation - check image properties
-            width, height = self.image_data.size
+            # Basic validation - check image properties (as decoded, before downsizing)
+            width, height = self.image_metadata.get('original_size', self.image_data.size)
             
             # Check if image is too small to be a chart
             if width < 100 or height < 100:
@@ -240,7 +432,32 @@ class AnalysisSession:
             logger.error(f"Error validating chart image: {e}")
             return {'has_chart': False, 'reason': f'Validation error: {str(e)}'}
     
+    def get_model_image(self) -> Optional[bytes]:
+        """
+        Return the session image encoded for the vision model, or None.
+        
+        The image never changes, so it is resized and JPEG-encoded once and the
+        same bytes are sent (and cache-keyed) on every conversation turn.
+        """
+        if self._model_image is None and self.image_data is not None:
+            self._model_image = ollama_client.prepare_image(self.image_data)
+        return self._model_image
+    
     def get_summary_stats(self) -> Dict[str, Any]:
+        """
+        Return summary statistics for the data.
+        
+        Session data does not change after loading, so the summary is computed
+        once and reused for every later conversation turn.
+        """
+        if self._summary_stats is None:
+            summary = self._compute_summary_stats()
+            if summary is not None and 'error' not in summary:
+                self._summary_stats = summary
+            return summary
+        return self._summary_stats
+    
+    def _compute_summary_stats(self) -> Optional[Dict[str, Any]]:
         """Generate summary statistics for the data"""
         try:
             if self.data_type == 'table' and self.df is not None:
@@ -254,21 +471,18 @@ class AnalysisSession:
                     'dtypes': {col: str(dtype) for col, dtype in zip(self.df.columns, self.df.dtypes)}
                 }
                 
-                # Add basic statistics for numeric columns
-                numeric_stats = {}
-                for col in self.df.columns:
-                    try:
-                        # Try to cast to numeric
-                        numeric_col = self.df[col].cast(pl.Float64, strict=False)
-                        if numeric_col.null_count() < self.df.height:  # Has some valid numeric values
-                            numeric_stats[col] = {
-                                'mean': float(numeric_col.mean()) if numeric_col.mean() is not None else None,
-                                'min': float(numeric_col.min()) if numeric_col.min() is not None else None,
-                                'max': float(numeric_col.max()) if numeric_col.max() is not None else None,
-                                'null_count': numeric_col.null_count()
-                            }
-                    except:
-                        pass  # Not a numeric column
+                # Add basic statistics for numeric columns; each aggregate runs over
+                # all columns in one Polars call instead of several calls per column
+                numeric = self.df_numeric
+                means, mins, maxes, null_counts = (
+                    aggregate.row(0)
+                    for aggregate in (numeric.mean(), numeric.min(), numeric.max(), numeric.null_count())
+                )
+                numeric_stats = {
+                    col: {'mean': mean, 'min': low, 'max': high, 'null_count': nulls}
+                    for col, mean, low, high, nulls in zip(numeric.columns, means, mins, maxes, null_counts)
+                    if nulls < self.df.height  # Has some valid numeric values
+                }
                 
                 summary['numeric_stats'] = numeric_stats
                 return summary
@@ -284,6 +498,25 @@ class AnalysisSession:
             logger.error(f"Error getting summary stats: {e}", exc_info=True)
             return {'error': str(e)}
     
+    def get_prompt_prefix(self) -> str:
+        """
+        Return the invariant opening of conversational prompts for this session.
+        
+        Built once and reused so every turn starts with byte-identical text,
+        which lets Ollama reuse its cached KV state for those tokens.
+        """
+        if self._prompt_prefix is None:
+            self._prompt_prefix = f"""You are analyzing data from a web page.
+
+Data Type: {self.data_type}
+
+Data Summary:
+{to_prompt_json(self.get_summary_stats())}
+
+Conversation History:
+"""
+        return self._prompt_prefix
+    
     def execute_polars_query(self, query_description: str) -> Dict[str, Any]:
         """
         Execute Polars operations based on natural language query.
@@ -297,14 +530,15 @@ class AnalysisSession:
             return {
                 'success': True,
                 'description': query_description,
-                'data': self.df.head(10).to_dicts(),
+                # Column-oriented: one list per column instead of a dict per row
+                'data': self.df.head(10).to_dict(as_series=False),
                 'shape': {'rows': self.df.height, 'columns': self.df.width}
             }
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             return {'error': str(e)}
     
-    def generate_chart(self, chart_spec: Dict[str, Any]) -> Optional[str]:
+    def generate_chart(self, chart_spec: Dict[str, Any], df: Optional[pl.DataFrame] = None) -> Optional[bytes]:
         """
         Generate matplotlib chart based on specification.
         
@@ -316,11 +550,15 @@ class AnalysisSession:
                 - title: chart title
                 - x_label: optional custom x-axis label
                 - y_label: optional custom y-axis label
+            df: Optional DataFrame to plot instead of the session's own data
                 
         Returns:
-            Base64 encoded PNG image or None
+            Chart image bytes (chart_renderer.mime_type) or None
         """
-        if self.df is None:
+        numeric_df = None
+        if df is None:
+            df, numeric_df = self.df, self.df_numeric
+        if df is None:
             logger.error("No DataFrame available for chart generation")
             return None
         
@@ -332,98 +570,98 @@ class AnalysisSession:
             x_label = chart_spec.get('x_label', x_col)
             y_label = chart_spec.get('y_label', y_col)
             
-            # Create figure
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            if chart_type == 'bar' and x_col and y_col:
-                x_data = self.df[x_col].to_list()
-                y_data = self.df[y_col].cast(pl.Float64, strict=False).to_list()
-                ax.bar(x_data, y_data)
-                ax.set_xlabel(x_label if x_label else x_col)
-                ax.set_ylabel(y_label if y_label else y_col)
-                
-            elif chart_type == 'line' and x_col and y_col:
-                x_data = self.df[x_col].to_list()
-                y_data = self.df[y_col].cast(pl.Float64, strict=False).to_list()
-                ax.plot(x_data, y_data, marker='o')
-                ax.set_xlabel(x_label if x_label else x_col)
-                ax.set_ylabel(y_label if y_label else y_col)
-                
+            def as_numbers(col: str) -> np.ndarray:
+                # The session's columns were cast once at load; ad-hoc frames are cast here.
+                # A NumPy view of the Float64 buffer (nulls become NaN, which bar and
+                # hist skip) avoids boxing every value into a Python float
+                if numeric_df is not None:
+                    return numeric_df[col].to_numpy()
+                return df[col].cast(pl.Float64, strict=False).to_numpy()
+            
+            x_data = y_data = None
+            if chart_type in ('bar', 'line') and x_col and y_col:
+                x_data, y_data = df[x_col].to_list(), as_numbers(y_col)
             elif chart_type == 'scatter' and x_col and y_col:
-                x_data = self.df[x_col].cast(pl.Float64, strict=False).to_list()
-                y_data = self.df[y_col].cast(pl.Float64, strict=False).to_list()
-                ax.scatter(x_data, y_data)
-                ax.set_xlabel(x_label if x_label else x_col)
-                ax.set_ylabel(y_label if y_label else y_col)
-                
+                x_data, y_data = as_numbers(x_col), as_numbers(y_col)
             elif chart_type == 'pie' and y_col:
-                labels = self.df[x_col].to_list() if x_col else None
-                values = self.df[y_col].cast(pl.Float64, strict=False).to_list()
-                ax.pie(values, labels=labels, autopct='%1.1f%%')
-                
+                x_data = df[x_col].to_list() if x_col else None
+                y_data = as_numbers(y_col)
             elif chart_type == 'hist' and y_col:
-                data = self.df[y_col].cast(pl.Float64, strict=False).to_list()
-                ax.hist(data, bins=20)
-                ax.set_xlabel(y_label if y_label else y_col)
-                ax.set_ylabel('Frequency')
-            
-            ax.set_title(title)
-            plt.tight_layout()
+                y_data = as_numbers(y_col)
             
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-            plt.close(fig)
+            chart_image = chart_renderer.render(
+                chart_type, x_data, y_data, title,
+                x_label or x_col, y_label or y_col
+            )
             
             logger.info(f"Generated {chart_type} chart for session {self.session_id}")
-            return f"data:image/png;base64,{image_base64}"
+            return chart_image
             
         except Exception as e:
             logger.error(f"Error generating chart: {e}", exc_info=True)
             return None
     
     def add_conversation(self, role: str, content: str):
-        """Add to conversation history"""
+        """Add to conversation history, dropping the oldest messages past the cap"""
         self.conversation_history.append({
             'role': role,
             'content': content,
             'timestamp': datetime.now().isoformat()
         })
+        # A plain list rather than a deque, since callers slice the recent tail
+        if len(self.conversation_history) > self.MAX_CONVERSATION_MESSAGES:
+            del self.conversation_history[:-self.MAX_CONVERSATION_MESSAGES]
         
     def touch(self):
         """Update last accessed time"""
-        self.last_accessed = datetime.now()
+        self.last_accessed = time.monotonic()
         
     def close(self):
         """Cleanup session resources"""
         self.df = None
+        self.df_numeric = None
         self.image_data = None
+        self._model_image = None
+        self._summary_stats = None
+        self._prompt_prefix = None
+        self.query_results.clear()
         logger.info(f"Closed session {self.session_id}")
 
 
 class SessionManager:
     """Manages all analysis sessions"""
     
-    def __init__(self, session_timeout_minutes: int = 30):
-        self.sessions: Dict[str, AnalysisSession] = {}
-        self.session_timeout = timedelta(minutes=session_timeout_minutes)
-        self.lock = threading.Lock()
+    # Shortest sleep between cleanup passes, so sessions expiring together
+    # are swept in one batch
+    MIN_CLEANUP_INTERVAL = 1.0
+    
+    def __init__(self, session_timeout_minutes: int = 30, max_sessions: int = 1000):
+        # Sessions are striped over SESSION_SHARDS (lock, map) pairs by session
+        # ID hash, so requests for unrelated sessions rarely contend. Each map
+        # is least recently used first, and every read-modify-write of it
+        # (expiry check + pop, touch + move, insert + evict) runs under its
+        # shard's lock so the sweep cannot close a session a request has just
+        # touched; close() and logging happen after release.
+        self._shards: List[Tuple[threading.Lock, "OrderedDict[str, AnalysisSession]"]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(SESSION_SHARDS)
+        ]
+        self.session_timeout = session_timeout_minutes * 60  # seconds
+        self.max_sessions = max_sessions
+        # LRU eviction is per shard, so each holds an equal share of the cap
+        self._shard_max_sessions = -(-max_sessions // SESSION_SHARDS)
+        # Set by close_all() to wake and stop the cleanup thread
+        self._stop_cleanup = threading.Event()
         
         # Start cleanup thread
         self._start_cleanup_thread()
         
     def create_session(self, data: Dict[str, Any], url: str) -> str:
         """Create a new session and return session ID"""
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_hex(16)
         
         try:
             session = AnalysisSession(session_id, data, url)
-            
-            with self.lock:
-                self.sessions[session_id] = session
-                
+            self.add_session(session)
             logger.info(f"Created session {session_id}")
             return session_id
             
@@ -431,53 +669,134 @@ class SessionManager:
             logger.error(f"Error creating session: {e}")
             raise
             
+    def _shard(self, session_id: str) -> Tuple[threading.Lock, "OrderedDict[str, AnalysisSession]"]:
+        """Return the (lock, map) pair holding session_id."""
+        return self._shards[hash(session_id) & (SESSION_SHARDS - 1)]
+        
+    @property
+    def session_count(self) -> int:
+        """Number of active sessions (read without locking, so approximate)."""
+        return sum(len(sessions) for _, sessions in self._shards)
+        
+    def add_session(self, session: AnalysisSession):
+        """
+        Register a session under its own ID, replacing any existing one.
+        
+        Session IDs are client-provided, so once a shard holds its share of
+        max_sessions its least recently used sessions are evicted to keep memory
+        bounded. Evicted sessions are dropped rather than closed, so a request
+        still holding one can finish; its data is freed once that request lets go.
+        """
+        evicted = []
+        lock, sessions = self._shard(session.session_id)
+        with lock:
+            sessions[session.session_id] = session
+            sessions.move_to_end(session.session_id)
+            while len(sessions) > self._shard_max_sessions:
+                evicted.append(sessions.popitem(last=False)[0])
+        for session_id in evicted:
+            logger.info(f"Evicted least recently used session {session_id}")
+        
+    def _is_expired(self, session: AnalysisSession, now: float) -> bool:
+        return now - session.last_accessed > self.session_timeout
+        
     def get_session(self, session_id: str) -> Optional[AnalysisSession]:
         """Get session by ID"""
-        with self.lock:
-            logger.info(f"Looking up session: {session_id}")
-            logger.info(f"Active sessions: {list(self.sessions.keys())}")
-            session = self.sessions.get(session_id)
-            if session:
+        # Only the count is logged; listing every session ID would make each
+        # lookup O(active sessions)
+        logger.debug("Looking up session %s among %s active", session_id, self.session_count)
+        expired = None
+        lock, sessions = self._shard(session_id)
+        with lock:
+            session = sessions.get(session_id)
+            if session and self._is_expired(session, time.monotonic()):
+                # Expired but not yet swept by the cleanup thread
+                expired = sessions.pop(session_id)
+                session = None
+            elif session:
                 session.touch()
-                logger.info(f"Session found: {session_id}, last_accessed updated")
-            else:
-                logger.warning(f"Session not found: {session_id}")
-            return session
+                sessions.move_to_end(session_id)
+        if expired:
+            expired.close()
+            logger.info(f"Ended expired session {session_id}")
+        if session:
+            logger.debug("Session found: %s, last_accessed updated", session_id)
+        else:
+            logger.warning("Session not found: %s", session_id)
+        return session
             
     def end_session(self, session_id: str):
         """End a session and cleanup resources"""
-        with self.lock:
-            session = self.sessions.pop(session_id, None)
-            if session:
-                session.close()
-                logger.info(f"Ended session {session_id}")
+        lock, sessions = self._shard(session_id)
+        with lock:
+            session = sessions.pop(session_id, None)
+        if session:
+            session.close()
+            logger.info(f"Ended session {session_id}")
                 
-    def cleanup_expired_sessions(self):
-        """Remove expired sessions"""
-        now = datetime.now()
-        expired = []
+    def cleanup_expired_sessions(self) -> float:
+        """
+        Remove expired sessions.
         
-        with self.lock:
-            for session_id, session in self.sessions.items():
-                if now - session.last_accessed > self.session_timeout:
-                    expired.append(session_id)
-                    
-        for session_id in expired:
-            self.end_session(session_id)
-            logger.info(f"Cleaned up expired session {session_id}")
+        Shards are swept one at a time, each under its own lock only. Each is
+        kept in least recently used order, so expired sessions are popped from
+        the front until the first fresh one; the cost is proportional to the
+        number expired, not the number active. Expiry is decided and the session
+        popped under the shard lock, so a concurrent get_session either touches
+        it first (and it stays) or does not find it.
+        
+        Returns:
+            Seconds until the oldest remaining session expires (the full
+            timeout when there are none)
+        """
+        now = time.monotonic()
+        remaining = self.session_timeout
+        for lock, sessions in self._shards:
+            expired = []
+            with lock:
+                for session in sessions.values():
+                    if not self._is_expired(session, now):
+                        remaining = min(remaining, session.last_accessed + self.session_timeout - now)
+                        break
+                    expired.append(session)
+                for session in expired:
+                    del sessions[session.session_id]
+            
+            for session in expired:
+                session.close()
+                logger.info("Cleaned up expired session %s", session.session_id)
+        return remaining
             
     def _start_cleanup_thread(self):
-        """Start background thread for session cleanup"""
+        """
+        Start background thread for session cleanup.
+        
+        The thread sleeps until the oldest session is due to expire rather
+        than polling. New and touched sessions join the back of their shard's
+        LRU order and expire later than its front, so they never need to wake
+        it early.
+        """
         def cleanup_loop():
-            import time
-            while True:
-                time.sleep(300)  # Check every 5 minutes
-                self.cleanup_expired_sessions()
+            delay = self.session_timeout
+            while not self._stop_cleanup.wait(max(delay, self.MIN_CLEANUP_INTERVAL)):
+                delay = self.cleanup_expired_sessions()
                 
         thread = threading.Thread(target=cleanup_loop, daemon=True)
         thread.start()
         logger.info("Started session cleanup thread")
+        
+    def close_all(self):
+        """Stop the cleanup thread and end every session"""
+        self._stop_cleanup.set()
+        closing = []
+        for lock, sessions in self._shards:
+            with lock:
+                closing.extend(sessions.values())
+                sessions.clear()
+        for session in closing:
+            session.close()
+        logger.info("Closed all sessions")
 
 
 # Global session manager instance
-session_manager = SessionManager(session_timeout_minutes=30)
+session_manager = SessionManager(session_timeout_minutes=30, max_sessions=1000)